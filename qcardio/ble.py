@@ -1,148 +1,219 @@
 # qcardio/ble.py
 
 import asyncio
-import subprocess
-import re
+import functools
+import os
+import pickle
 from pathlib import Path
 import yaml
 from bleak import BleakScanner, BleakClient
 from bleak.exc import BleakError
 
-BASE_UUID_FMT = "0000{short}-0000-1000-8000-00805f9b34fb"
+# libyaml C binding when available; pure-Python parser otherwise
+try:
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader
 
+# 16-bit UUIDs expand to 0000xxxx + this Bluetooth base suffix
+BASE_UUID_PREFIX = "0000"
+BASE_UUID_SUFFIX = "-0000-1000-8000-00805f9b34fb"
+
+# padding pool for the discover output; sliced instead of rebuilt per char
+_DOTS = "." * 40
+
+@functools.lru_cache(maxsize=1)
 def _list_adapters() -> list[str]:
+    """
+    Lists BLE adapters straight from sysfs (no hciconfig fork).
+    Cached: adapters do not come and go within a CLI session.
+    """
     try:
-        out = subprocess.check_output(["hciconfig"], text=True)
-        return re.findall(r"^(hci\d+):", out, flags=re.MULTILINE)
-    except Exception:
+        return sorted(p.name for p in Path("/sys/class/bluetooth").glob("hci*"))
+    except OSError:
         return []
 
 
-def _load_standard_uuids() -> dict[str, str]:
+def _load_standard_uuids(yaml_files: list[Path]) -> dict[str, str]:
     """
-    Loads all .yaml files in resources/uuids,
-    extracts data['uuids'], and builds a map full_uuid -> name.
+    Loads the given .yaml files, extracts data['uuids'],
+    and builds a map full_uuid -> name.
     Handles entry['uuid'] as both int and str.
     """
     uuids: dict[str, str] = {}
-    base_dir = Path(__file__).parent
-    yaml_dir = base_dir / "resources" / "uuids"
-    if not yaml_dir.is_dir():
-        return uuids
-
-    for yf in yaml_dir.glob("*.yaml"):
-        data = yaml.safe_load(yf.read_text())
+    for yf in yaml_files:
+        data = yaml.load(yf.read_text(), Loader=_YamlLoader)
         for entry in data.get("uuids", []):
             raw = entry.get("uuid", "")
-            # normalize to 4-digit hex string
+            # normalize to 4-digit hex string; int(s, 16) also
+            # accepts the "0x2A00" form, so one branch per type
             if isinstance(raw, int):
-                short = f"{raw:04x}"
+                short = format(raw, "04x")
             else:
                 s = str(raw)
-                if s.lower().startswith("0x"):
-                    # convert "0x2A00" to integer then to hex
-                    short = f"{int(s, 16):04x}"
-                else:
+                try:
+                    short = format(int(s, 16), "04x")
+                except ValueError:
                     short = s.lower().zfill(4)
-            full = BASE_UUID_FMT.format(short=short)
             name = entry.get("name", "").strip()
-            if full and name:
-                uuids[full] = name
+            if name:
+                uuids[BASE_UUID_PREFIX + short + BASE_UUID_SUFFIX] = name
     return uuids
 
-# Load the map once
-STANDARD_UUIDS = _load_standard_uuids()
+@functools.cache
+def standard_uuids() -> dict[str, str]:
+    """
+    Returns the full_uuid -> name map, loading it on first use.
+    Parsed YAMLs are cached as a pickle next to them (keyed by mtime)
+    so later CLI invocations skip the YAML parser entirely.
+    """
+    yaml_dir = Path(__file__).parent / "resources" / "uuids"
+    if not yaml_dir.is_dir():
+        return {}
 
-def discover_device(address: str, adapter: str | None = None, timeout: float = 5.0):
+    yaml_files = sorted(yaml_dir.glob("*.yaml"))
+    cache_path = yaml_dir / "_cache.pkl"
+    newest = max((yf.stat().st_mtime for yf in yaml_files), default=0.0)
+    try:
+        if cache_path.stat().st_mtime >= newest:
+            return pickle.loads(cache_path.read_bytes())
+    except Exception:
+        pass  # missing, truncated or unreadable cache: reparse
+
+    uuids = _load_standard_uuids(yaml_files)
+    try:
+        # write to a temp file and rename so a process killed mid-write
+        # never leaves a truncated cache behind
+        tmp = cache_path.with_name(cache_path.name + ".tmp")
+        tmp.write_bytes(pickle.dumps(uuids))
+        os.replace(tmp, cache_path)
+    except OSError:
+        pass  # cache is best-effort (e.g. read-only install)
+    return uuids
+
+async def _find_device(address: str, adapter: str | None, timeout: float):
+    """Adapter fallback + device lookup shared by the BLE helpers."""
+    valid = _list_adapters()
+    if adapter and adapter not in valid:
+        adapter = valid[0] if valid else None
+    try:
+        device = await BleakScanner.find_device_by_address(
+            address, timeout=timeout, adapter=adapter
+        )
+    except BleakError:
+        if not adapter:
+            # no adapter arg to blame: retrying the identical scan
+            # would just burn another full timeout
+            raise
+        device = await BleakScanner.find_device_by_address(
+            address, timeout=timeout
+        )
+    return device, adapter
+
+
+async def discover_device_async(address: str,
+                                adapter: str | None = None,
+                                timeout: float = 5.0):
     """
     Scans for a BLE device and prints services/characteristics,
     adding the standard description if the UUID is in the map.
     """
-    async def _discover():
-        nonlocal adapter
-
-        # Adapter fallback
-        valid = _list_adapters()
-        if adapter and adapter not in valid:
-            first = valid[0] if valid else None
-            print(f"[WARN] Adapter '{adapter}' not found. Using '{first}'.")
-            adapter = first
-
-        # Find device
-        try:
-            device = await BleakScanner.find_device_by_address(
-                address, timeout=timeout, adapter=adapter
-            )
-        except BleakError:
-            device = await BleakScanner.find_device_by_address(
-                address, timeout=timeout
-            )
-
-        if not device:
-            print(f"[FAIL] Device {address} not found")
-            return
-
-        # Connect & print
-        conn_args = {"adapter": adapter} if adapter else {}
-        try:
-            async with BleakClient(device, **conn_args) as client:
-                used = adapter or "default"
-                print(f"[OK] Connected to {address} ({used})\n")
-                for svc in client.services:
-                    su = svc.uuid.lower()
-                    sname = STANDARD_UUIDS.get(su)
-                    svc_label = su + (f" ({sname})" if sname else "")
-                    print(f"Service {svc_label}:")
-                    for char in svc.characteristics:
-                        cu = char.uuid.lower()
-                        cname = STANDARD_UUIDS.get(cu)
-                        clabel = cu
-                        props = ",".join(char.properties)
-                        desc = f" ({cname})" if cname else ""
-                        spacer = " " + "." * (30 - len(props) - 2) + " "
-                        print(f"  └─ {clabel}  [{props}]{spacer}{desc}")
-                print()
-        except BleakError as e:
-            print(f"[FAIL] BLE connection error: {e}")
-
-    asyncio.run(_discover())
-
-# qcardio/ble.py  (add below discover_device)
+    valid = _list_adapters()
+    if adapter and adapter not in valid:
+        first = valid[0] if valid else None
+        print(f"[WARN] Adapter '{adapter}' not found. Using '{first}'.")
+        adapter = first
+
+    device, adapter = await _find_device(address, adapter, timeout)
+    if not device:
+        print(f"[FAIL] Device {address} not found")
+        return
+
+    # Connect & print
+    conn_args = {"adapter": adapter} if adapter else {}
+    try:
+        async with BleakClient(device, **conn_args) as client:
+            used = adapter or "default"
+            print(f"[OK] Connected to {address} ({used})\n")
+            name_of = standard_uuids().get
+            for svc in client.services:
+                su = svc.uuid.casefold()
+                sname = name_of(su)
+                svc_label = su + (f" ({sname})" if sname else "")
+                print(f"Service {svc_label}:")
+                for char in svc.characteristics:
+                    cu = char.uuid.casefold()
+                    cname = name_of(cu)
+                    props = ",".join(char.properties)
+                    desc = f" ({cname})" if cname else ""
+                    spacer = " " + _DOTS[:max(0, 28 - len(props))] + " "
+                    print(f"  └─ {cu}  [{props}]{spacer}{desc}")
+            print()
+    except BleakError as e:
+        print(f"[FAIL] BLE connection error: {e}")
+
+
+def discover_device(address: str, adapter: str | None = None, timeout: float = 5.0):
+    """Synchronous wrapper around discover_device_async."""
+    asyncio.run(discover_device_async(address, adapter, timeout))
+
+
+async def read_characteristic_async(address: str,
+                                    adapter: str | None,
+                                    uuid: str,
+                                    timeout: float = 5.0) -> bytes:
+    """
+    Performs a BLE read of a single characteristic and returns the raw bytes.
+    Uses the same adapter fallback mechanism as discover_device.
+    """
+    device, adapter = await _find_device(address, adapter, timeout)
+    if not device:
+        raise BleakError(f"Device {address} not found")
+
+    conn_args = {"adapter": adapter} if adapter else {}
+    async with BleakClient(device, **conn_args) as client:
+        return await client.read_gatt_char(uuid)
+
 
 def read_characteristic(address: str,
                         adapter: str | None,
                         uuid: str,
                         timeout: float = 5.0) -> bytes:
+    """Synchronous wrapper around read_characteristic_async."""
+    return asyncio.run(read_characteristic_async(address, adapter, uuid, timeout))
+
+
+async def read_characteristics_async(address: str,
+                                     adapter: str | None,
+                                     uuids: list[str],
+                                     timeout: float = 5.0,
+                                     return_exceptions: bool = False) -> dict:
     """
-    Performs a BLE read of a single characteristic and returns the raw bytes.
-    Uses the same adapter fallback mechanism as discover_device.
+    Reads several characteristics over a single BLE connection and
+    returns {uuid: raw bytes}. The reads are issued concurrently, so
+    the device answers them pipelined on one ATT bearer.
+    With return_exceptions=True a failed read maps its UUID to the
+    exception instead of aborting the remaining reads.
     """
-    import asyncio
-    from bleak import BleakScanner, BleakClient
-    from bleak.exc import BleakError
-
-    async def _read():
-        nonlocal adapter
-        # adapter fallback if invalid
-        valid = _list_adapters()
-        if adapter and adapter not in valid:
-            adapter = valid[0] if valid else None
-
-        # find device
-        try:
-            device = await BleakScanner.find_device_by_address(
-                address, timeout=timeout, adapter=adapter
-            )
-        except BleakError:
-            device = await BleakScanner.find_device_by_address(
-                address, timeout=timeout
-            )
-        if not device:
-            raise BleakError(f"Device {address} not found")
-
-        # connect and read
-        conn_args = {"adapter": adapter} if adapter else {}
-        async with BleakClient(device, **conn_args) as client:
-            return await client.read_gatt_char(uuid)
-
-    return asyncio.run(_read())
+    device, adapter = await _find_device(address, adapter, timeout)
+    if not device:
+        raise BleakError(f"Device {address} not found")
+
+    conn_args = {"adapter": adapter} if adapter else {}
+    async with BleakClient(device, **conn_args) as client:
+        raws = await asyncio.gather(
+            *(client.read_gatt_char(u) for u in uuids),
+            return_exceptions=return_exceptions,
+        )
+        return dict(zip(uuids, raws))
+
+
+def read_characteristics(address: str,
+                         adapter: str | None,
+                         uuids: list[str],
+                         timeout: float = 5.0,
+                         return_exceptions: bool = False) -> dict:
+    """Synchronous wrapper around read_characteristics_async."""
+    return asyncio.run(read_characteristics_async(
+        address, adapter, uuids, timeout, return_exceptions
+    ))
@@ -2,8 +2,11 @@
 #!/usr/bin/env python3
 import argparse
 import cmd
+import csv
 import importlib
+import json
 import os
+import re
 import threading
 import time
 import sys
@@ -11,13 +14,31 @@ import asyncio
 import itertools
 import shlex
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 from bleak import BleakScanner
 from bleak.exc import BleakError
 
 from qcardio.services.config import ConfigService
 from qcardio.services.state import StateService
 from qcardio.services.history import HistoryService
-from qcardio.ble import discover_device, read_characteristic, STANDARD_UUIDS
+from qcardio.ble import (
+    discover_device_async,
+    read_characteristic_async,
+    read_characteristics_async,
+    standard_uuids,
+)
+
+
+def _clone(data):
+    """Deep-copy a JSON-shaped dataset via a serialization round-trip,
+    which is much faster than copy.deepcopy for plain dicts/lists."""
+    if orjson is not None:
+        return orjson.loads(orjson.dumps(data))
+    return json.loads(json.dumps(data))
 
 
 class QardioShell(cmd.Cmd):
@@ -27,34 +48,79 @@ class QardioShell(cmd.Cmd):
 
     def __init__(self, device, address, adapter):
         super().__init__()
+        # command dispatch table built once, instead of a getattr per line
+        self._dispatch = {
+            name[3:]: getattr(self, name)
+            for name in dir(self) if name.startswith("do_")
+        }
         self.cfg = ConfigService(device, address, adapter)
         self.state = StateService(self.cfg)
         self.hist = HistoryService()
+        # open measurement outfiles, kept line-buffered across commands
+        self._out_files = {}
+        # one event loop for all BLE calls, instead of a fresh
+        # asyncio.run setup/teardown per command
+        self._loop = asyncio.new_event_loop()
+        threading.Thread(target=self._loop.run_forever, daemon=True).start()
         self.device = self._load_plugin(device)
 
-        # verify that the BLE device is available
-        self._verify_device()
+        # BLE availability is checked lazily on the first command that
+        # needs it, so help/exit/dataset don't pay the scan cost
+        self._verified = False
         # start periodic keep-alive polling
         # self._start_keep_alive()
 
-        # ensure "_" slot is initialized
-        self.state.data["_"] = {}
-        self.state.save()
+        # ensure "_" slot is initialized (no disk write at startup)
+        self.state.data.setdefault("_", {})
+
+    def _ensure_verified(self) -> bool:
+        """Verify the BLE device on first use instead of at startup."""
+        if not self._verified:
+            self._verified = self._verify_device()
+        return self._verified
+
+
+    def onecmd(self, line):
+        """Like cmd.Cmd.onecmd, but dispatching via the cached table."""
+        cmd_name, arg, line = self.parseline(line)
+        if not line:
+            return self.emptyline()
+        if cmd_name is None:
+            return self.default(line)
+        self.lastcmd = line
+        if line == "EOF":
+            self.lastcmd = ""
+        if cmd_name == "":
+            return self.default(line)
+        func = self._dispatch.get(cmd_name)
+        if func is None:
+            return self.default(line)
+        return func(arg)
+
+    def _run(self, coro):
+        """Submit a coroutine to the shell loop and wait for its result."""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
 
-        
     def _load_plugin(self, name):
         """Dynamically load the plugin for the given device."""
         mod = importlib.import_module(f"qcardio.commands.{name}")
         self._Phase = getattr(mod, "Phase", None)
         return mod.Plugin(self.cfg, self.state)
 
-    def _progress_print(self, info: dict):
+    def _progress_print(self, info):
         """
         Callback to display measurement progress.
-        Expects info with 'type': 'bp' or 'phase'.
+        Progress BP frames arrive as lean (systolic, diastolic, unit,
+        flags) tuples; phase and final events as dicts with 'type'.
         """
         # record every progress callback in state["_"]["progress"]
-        if info.get("type") == "bp":
+        if type(info) is tuple:
+            systolic, diastolic, unit, _flags = info
+            sys.stdout.write(
+                "\r%s Measuring: %.0f/%.0f %s "
+                % (next(self._spinner), systolic, diastolic, unit)
+            )
+        elif info.get("type") == "bp":
             sys.stdout.write(
                 "\r%s Measuring: %.0f/%.0f %s "
                 % (
@@ -78,23 +144,27 @@ class QardioShell(cmd.Cmd):
             sys.stdout.write(f"\r{next(self._spinner)} {msg}")
         sys.stdout.flush()
         
-    def _verify_device(self):
+    def _verify_device(self) -> bool:
         """
-        Ensure the BLE device is found before entering the shell.
-        Exits if the device is not reachable.
+        Check that the BLE device is reachable.
+        Returns False (after printing a [FAIL]) when it is not, so the
+        calling command can abort without killing the shell.
         """
         try:
-            dev = asyncio.run(
+            # find_device_by_address returns as soon as the device
+            # advertises; 2s covers a full advertising interval
+            dev = self._run(
                 BleakScanner.find_device_by_address(
-                    self.cfg.address, timeout=5.0, adapter=self.cfg.adapter
+                    self.cfg.address, timeout=2.0, adapter=self.cfg.adapter
                 )
             )
         except BleakError:
             dev = None
 
         if not dev:
-            print(f"[FAIL] Device {self.cfg.address} not reachable. Exiting.")
-            sys.exit(1)
+            print(f"[FAIL] Device {self.cfg.address} not reachable.")
+            return False
+        return True
 
     def _start_keep_alive(self):
         """
@@ -128,7 +198,22 @@ class QardioShell(cmd.Cmd):
         if not address:
             print("[FAIL] Please specify a BLE address via --address or config.")
             return
-        discover_device(address, adapter)
+        if not self._ensure_verified():
+            return
+        self._run(discover_device_async(address, adapter))
+
+    # Device Information characteristics: immutable for a given device,
+    # so their values may be cached across invocations (battery must not)
+    _DI_UUIDS = (
+        "00002a29-0000-1000-8000-00805f9b34fb",  # Manufacturer Name String
+        "00002a24-0000-1000-8000-00805f9b34fb",  # Model Number String
+        "00002a26-0000-1000-8000-00805f9b34fb",  # Firmware Revision String
+        "00002a27-0000-1000-8000-00805f9b34fb",  # Hardware Revision String
+        "00002a23-0000-1000-8000-00805f9b34fb",  # System ID
+        "00002a28-0000-1000-8000-00805f9b34fb",  # Software Revision String
+        "00002a50-0000-1000-8000-00805f9b34fb",  # PnP ID
+        "00002a25-0000-1000-8000-00805f9b34fb",  # Serial Number String
+    )
 
     def do_info(self, arg):
         """
@@ -136,41 +221,64 @@ class QardioShell(cmd.Cmd):
                        Manufacturer, Model, FW/HW rev, System ID, SW rev,
                        PnP ID, Serial Number.
         """
-        uuids = [
-            "00002a29-0000-1000-8000-00805f9b34fb",  # Manufacturer Name String
-            "00002a24-0000-1000-8000-00805f9b34fb",  # Model Number String
-            "00002a26-0000-1000-8000-00805f9b34fb",  # Firmware Revision String
-            "00002a27-0000-1000-8000-00805f9b34fb",  # Hardware Revision String
-            "00002a23-0000-1000-8000-00805f9b34fb",  # System ID
-            "00002a28-0000-1000-8000-00805f9b34fb",  # Software Revision String
-            "00002a50-0000-1000-8000-00805f9b34fb",  # PnP ID
-            "00002a25-0000-1000-8000-00805f9b34fb",  # Serial Number String
-        ]
         address = self.cfg.address
         adapter = self.cfg.adapter
         if not address:
             print("[FAIL] Please specify a BLE address via --address or config.")
             return
 
-        for cu in uuids:
-            name = STANDARD_UUIDS.get(cu.lower(), "")
-            prefix = f"└─ {cu}  [read]"
+        # serve from the persistent cache, reading only the misses
+        cache = self.state.state.setdefault("_di_cache", {}).setdefault(address, {})
+        missing = [u for u in self._DI_UUIDS if u not in cache]
+        errors = {}
+        if missing:
+            reader = getattr(self.device, "read_characteristics", None)
             try:
-                raw = read_characteristic(address, adapter, cu)
+                if reader is not None:
+                    # plugin path: reuses its cached connection, no scan
+                    raws = reader(missing, return_exceptions=True)
+                elif self._ensure_verified():
+                    raws = self._run(read_characteristics_async(
+                        address, adapter, missing, return_exceptions=True
+                    ))
+                else:
+                    raws = {u: "device not reachable" for u in missing}
+            except Exception as e:
+                # connection-level failure: report it per characteristic
+                raws = {u: e for u in missing}
+            # cache only successful reads; failures are retried next time
+            for cu, raw in raws.items():
+                if isinstance(raw, (bytes, bytearray)):
+                    cache[cu] = raw.hex()
+                else:
+                    errors[cu] = raw
+            if len(errors) < len(missing):
+                self.state.save(force=True)
+
+        names = standard_uuids()
+        for cu in self._DI_UUIDS:
+            name = names.get(cu, "")
+            prefix = f"└─ {cu}  [read]"
+            if cu in cache:
+                raw = bytes.fromhex(cache[cu])
                 try:
                     val = raw.decode().strip()
                 except Exception:
                     val = raw.hex()
                 print(f"{prefix}  {val:<24}   ({name})")
-            except Exception as e:
-                print(f"{prefix}  [FAIL] Error: {e}   ({name})")
+            else:
+                print(f"{prefix}  [FAIL] Error: {errors.get(cu)}   ({name})")
 
     def do_read(self, arg):
         "read <uuid>   : read the specified characteristic UUID"
+        if not self._ensure_verified():
+            return
         print(self.device.read(arg.strip()))
 
     def do_write(self, arg):
         "write <uuid> <val> : write a value to the specified characteristic UUID"
+        if not self._ensure_verified():
+            return
         u, v = arg.split(maxsplit=1)
         print(self.device.write(u, v))
 
@@ -179,8 +287,11 @@ class QardioShell(cmd.Cmd):
         measure [<file>] : perform a measurement and optionally save results to <file>.
         """
         outfile = arg.strip() or None
+        if not self._ensure_verified():
+            return
         # reset "_" slot for this new measurement
         self.state.data["_"] = {"progress": []}
+        self.state.drop_indexes("_")
         self.state.save() 
         
         try:
@@ -188,14 +299,14 @@ class QardioShell(cmd.Cmd):
         except Exception as e:
             # record any exception that slipped through
             self.state.data["_"]["error"] = str(e)
-            self.state.save()
+            self.state.save(force=True)
             print(f"[FAIL] {e}")
             return
-        
+
         if result is None:
             # aborted according to plugin logic
             self.state.data["_"]["error"] = "measurement aborted"
-            self.state.save()
+            self.state.save(force=True)
             return
 
         print("Measurement result:")
@@ -204,33 +315,60 @@ class QardioShell(cmd.Cmd):
 
         # record final result
         self.state.data["_"]["measurement"] = result
-        self.state.save()
+        self.state.save(force=True)
 
         # optionally append to file
         if outfile:
             try:
-                with open(outfile, "a") as f:
-                    f.write(f"{result}\n")
+                self._append_result(outfile, result)
                 print("[OK] Saved to", outfile)
             except Exception as e:
                 print(f"[FAIL] Failed to write to {outfile}: {e}")
 
+    def _append_result(self, outfile: str, result: dict):
+        """
+        Append a measurement as a CSV row, reusing a line-buffered
+        handle across measurements instead of reopening per call.
+        A header row is written when the file starts out empty.
+        """
+        entry = self._out_files.get(outfile)
+        if entry is None or entry[0].closed:
+            header = not os.path.exists(outfile) or os.path.getsize(outfile) == 0
+            f = open(outfile, "a", buffering=1, newline="")
+            writer = csv.writer(f)
+            if header:
+                writer.writerow(result.keys())
+            entry = (f, writer)
+            self._out_files[outfile] = entry
+        entry[1].writerow(result.values())
+
     def _get_battery(self):
         """
         Internal helper to read the battery level.
         Returns percentage as integer.
         """
+        getter = getattr(self.device, "get_battery", None)
+        if getter is not None:
+            # plugin path: reuses its cached connection, no scan
+            try:
+                return getter()
+            except Exception as e:
+                print(f"[FAIL] Error reading battery level: {e}")
+                return None
+
         address = self.cfg.address
         adapter = self.cfg.adapter
         if not address:
             print("[FAIL] BLE address not specified (--address or config)")
             return None
 
+        if not self._ensure_verified():
+            return None
         try:
-            raw = read_characteristic(
+            raw = self._run(read_characteristic_async(
                 address, adapter,
                 "00002a19-0000-1000-8000-00805f9b34fb"
-            )
+            ))
             return raw[0] if raw else None
         except Exception as e:
             print(f"[FAIL] Error reading battery level: {e}")
@@ -280,6 +418,7 @@ class QardioShell(cmd.Cmd):
         """
         tokens = shlex.split(arg)
         filter_field = None
+        filter_pattern = None
         filter_re = None
         # parse optional filter
         if "--if" in tokens:
@@ -290,6 +429,7 @@ class QardioShell(cmd.Cmd):
                 if "=" in cond:
                     field, pattern = cond.split("=", 1)
                     filter_field = field
+                    filter_pattern = pattern
                     filter_re = re.compile(pattern)
         if not tokens:
             print("[FAIL] Missing operation")
@@ -308,7 +448,8 @@ class QardioShell(cmd.Cmd):
                 print("[FAIL] Usage: dataset bless <name>")
                 return
             name = tokens[1]
-            ds[name] = copy.deepcopy(ds.get("_"))
+            ds[name] = _clone(ds.get("_"))
+            self.state.drop_indexes(name)
             print(f"[OK] Blessed '_' as '{name}'")
             self.state.save()
 
@@ -319,6 +460,7 @@ class QardioShell(cmd.Cmd):
             name = tokens[1]
             if name in ds:
                 del ds[name]
+                self.state.drop_indexes(name)
                 print(f"[OK] Removed dataset '{name}'")
                 self.state.save()
             else:
@@ -335,13 +477,29 @@ class QardioShell(cmd.Cmd):
             data = ds[src]
             # apply filter if src is a list and filter provided
             if isinstance(data, list) and filter_field and filter_re:
-                filtered = [
-                    item for item in data
-                    if filter_field in item and filter_re.search(str(item[filter_field]))
-                ]
-                ds[dest] = filtered
+                if re.escape(filter_pattern) == filter_pattern:
+                    # plain literal: substring-match against the cached
+                    # index instead of rescanning the whole list
+                    index = self.state.dataset_index(src, filter_field, data)
+                    positions = sorted(
+                        pos
+                        for value, poss in index.items()
+                        if filter_pattern in value
+                        for pos in poss
+                    )
+                    ds[dest] = [data[pos] for pos in positions]
+                else:
+                    # bind as locals: this comprehension is the hot loop of cp
+                    search = filter_re.search
+                    ff = filter_field
+                    ds[dest] = [
+                        item for item in data
+                        if (v := item.get(ff)) is not None
+                        and search(v if type(v) is str else str(v))
+                    ]
             else:
-                ds[dest] = copy.deepcopy(data)
+                ds[dest] = _clone(data)
+            self.state.drop_indexes(dest)
             print(f"[OK] Copied dataset '{src}' to '{dest}'")
             self.state.save()
 
@@ -354,6 +512,8 @@ class QardioShell(cmd.Cmd):
                 print(f"[FAIL] Dataset '{old}' not found")
                 return
             ds[new] = ds.pop(old)
+            self.state.drop_indexes(old)
+            self.state.drop_indexes(new)
             print(f"[OK] Renamed dataset '{old}' to '{new}'")
             self.state.save()
 
@@ -376,7 +536,7 @@ class QardioShell(cmd.Cmd):
          """
          # save state (measurements, etc.)
          try:
-             self.state.save()
+             self.state.save(force=True)
          except Exception as e:
              print(f"[WARN] Failed to save state: {e}")
          # save command history
@@ -384,6 +544,20 @@ class QardioShell(cmd.Cmd):
              self.hist.save()
          except Exception as e:
              print(f"[WARN] Failed to save history: {e}")
+         # flush and close any measurement outfiles
+         for f, _ in self._out_files.values():
+             try:
+                 f.close()
+             except OSError as e:
+                 print(f"[WARN] Failed to close outfile: {e}")
+         self._out_files.clear()
+         # disconnect the plugin's cached BLE connection
+         try:
+             self.device.close()
+         except Exception as e:
+             print(f"[WARN] Failed to close device: {e}")
+         # stop the background BLE loop
+         self._loop.call_soon_threadsafe(self._loop.stop)
 
 def main():
     parser = argparse.ArgumentParser(prog="qardio")
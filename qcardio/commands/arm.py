@@ -1,10 +1,12 @@
 # qcardio/commands/arm.py
 
 import os
+import array
 import enum
 import asyncio
 import datetime
 import sys
+import threading
 import logging
 from bleak import BleakClient
 from bleak.exc import BleakError
@@ -43,9 +45,8 @@ class Phase(enum.Enum):
     ABORTED    = 0x05
     ERROR      = 0x06
 
-def parse_sfloat(raw: bytes) -> float:
-    """Decode IEEE-11073 SFLOAT (16-bit) into a float."""
-    val = raw[0] | (raw[1] << 8)
+def _compute_sfloat(val: int) -> float:
+    """Decode a 16-bit IEEE-11073 SFLOAT value into a float."""
     mantissa = val & 0x0FFF
     if mantissa >= 0x0800:
         mantissa -= 0x1000
@@ -54,7 +55,24 @@ def parse_sfloat(raw: bytes) -> float:
         exponent -= 0x0010
     return mantissa * (10 ** exponent)
 
-def parse_bp_notification(data: bytearray) -> dict:
+# all 65536 possible SFLOAT values, decoded once (notifications arrive
+# at tens of Hz during a measurement, four SFLOATs each)
+_SFLOAT_TABLE = array.array('d', map(_compute_sfloat, range(0x10000)))
+
+def parse_sfloat(raw: bytes) -> float:
+    """Decode IEEE-11073 SFLOAT (16-bit) into a float."""
+    return _SFLOAT_TABLE[raw[0] | (raw[1] << 8)]
+
+def parse_bp_notification_progress(data: bytearray) -> tuple:
+    """
+    Lean parse of a BP notification for progress display:
+    returns (systolic, diastolic, unit, flags) without building a dict.
+    """
+    flags = data[0]
+    unit = "kPa" if (flags & 0x01) else "mmHg"
+    return parse_sfloat(data[1:3]), parse_sfloat(data[3:5]), unit, flags
+
+def parse_bp_notification_full(data: bytearray) -> dict:
     """Parse raw Blood Pressure Measurement notification."""
     flags = data[0]
     offset = 1
@@ -79,43 +97,51 @@ def parse_bp_notification(data: bytearray) -> dict:
         "status": status
     }
 
+_COND_MAP = (
+    (0, "body_movement"),
+    (1, "cuff_too_loose"),
+    (2, "irregular_pulse"),
+    (3, "pulse_rate_out_of_range"),
+)
+
 def decode_conditions(status: int) -> list[str]:
     """Decode measurement status bits into human‐readable list."""
-    mapping = {
-        0: "body_movement",
-        1: "cuff_too_loose",
-        2: "irregular_pulse",
-        3: "pulse_rate_out_of_range",
-    }
-    return [name for bit, name in mapping.items() if status & (1 << bit)]
-
-async def _measure_async(address: str, timeout: int, progress=None) -> dict:
-    """Perform async measurement and return final data dict."""
-    event = asyncio.Event()
-    result = {}
-    aborted = {"flag": False, "reason": ""}
+    if not status:
+        return []
+    return [name for bit, name in _COND_MAP if status & (1 << bit)]
 
-    def _decode_vendor(raw: bytes):
-        if len(raw)==2 and raw[0]==0xF2:
-            return Phase(raw[1])
-        return None
+def _decode_vendor(raw: bytes):
+    """Decode a vendor control notification into a Phase, or None."""
+    if len(raw)==2 and raw[0]==0xF2:
+        return Phase(raw[1])
+    return None
 
-    def handle_measurement(_, data):
-        m = parse_bp_notification(data)
+def _make_handlers(event, result, aborted, progress):
+    """
+    Build the measurement/control notification callbacks.
+    State is bound via default args so the hot notification path
+    uses local loads instead of closure cells.
+    """
+    def handle_measurement(_, data, event=event, result=result,
+                           aborted=aborted, progress=progress):
         # implicit abort
         if len(data)>=5 and data[0]==0x04 and data[1]==0xFF:
-            status = int.from_bytes(data[3:5], "little")
             aborted["flag"]   = True
             aborted["reason"] = "arm movement"
             if progress: progress({"type":"phase","phase":Phase.ABORTED})
             event.set()
             raise QardioMeasurementAborted("arm movement")
-        if progress: progress({"type":"bp", **m})
-        if m["flags"] & 0x10:
+        if data[0] & 0x10:
+            # final frame: full parse, keep the dict shape for the result
+            m = parse_bp_notification_full(data)
+            if progress: progress({"type":"bp", **m})
             result.update(m)
             event.set()
+        elif progress:
+            # hot path during inflation: one tuple, no dicts
+            progress(parse_bp_notification_progress(data))
 
-    def handle_control(_, data):
+    def handle_control(_, data, event=event, progress=progress):
         phase = _decode_vendor(data)
         if not phase: return
         if progress: progress({"type":"phase","phase":phase})
@@ -124,27 +150,36 @@ async def _measure_async(address: str, timeout: int, progress=None) -> dict:
             event.set()
             raise QardioMeasurementAborted(str(phase))
 
+    return handle_measurement, handle_control
+
+async def _measure_async(client: BleakClient, timeout: int, progress=None) -> dict:
+    """Perform async measurement on an open client and return final data dict."""
+    event = asyncio.Event()
+    result = {}
+    aborted = {"flag": False, "reason": ""}
+    handle_measurement, handle_control = _make_handlers(
+        event, result, aborted, progress
+    )
+
     try:
-        async with BleakClient(address) as c:
-            await c.start_notify(BP_MEAS_UUID, handle_measurement)
-            await c.start_notify(CONTROL_UUID, handle_control)
-            await c.write_gatt_char(CONTROL_UUID, bytes([0xF1,0x01]), response=True)
-            await asyncio.wait_for(event.wait(), timeout=timeout)
+        await client.start_notify(BP_MEAS_UUID, handle_measurement)
+        await client.start_notify(CONTROL_UUID, handle_control)
+        await client.write_gatt_char(CONTROL_UUID, bytes([0xF1,0x01]), response=True)
+        await asyncio.wait_for(event.wait(), timeout=timeout)
     except (BleakError, asyncio.TimeoutError, OSError) as e:
         raise QardioConnectionError("cannot connect") from e
+    finally:
+        # leave the (reused) connection clean for later reads
+        for uuid in (BP_MEAS_UUID, CONTROL_UUID):
+            try:
+                await client.stop_notify(uuid)
+            except BleakError:
+                pass
 
     if aborted["flag"]:
         raise QardioMeasurementAborted(aborted["reason"])
     return result
 
-async def _read_char_async(address: str, uuid: str) -> bytes:
-    """Generic async read of a single GATT characteristic."""
-    try:
-        async with BleakClient(address) as c:
-            return await c.read_gatt_char(uuid)
-    except BleakError as e:
-        raise QardioConnectionError(f"read failed: {e}") from e
-
 class Plugin(PluginBase):
     """QardioArm plugin: exposes measure, battery, info, features."""
 
@@ -152,16 +187,86 @@ class Plugin(PluginBase):
         super().__init__(cfg, state)
         self.address = cfg.address
         self.timeout = int(cfg.poll_interval or 60)
+        # persistent event loop in a background thread: one BLE connection
+        # is kept open and reused instead of reconnecting per read
+        self._loop = asyncio.new_event_loop()
+        threading.Thread(target=self._loop.run_forever, daemon=True).start()
+        self._client: BleakClient | None = None
+
+    def _run(self, coro):
+        """Submit a coroutine to the plugin loop and wait for its result."""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    async def _get_client(self) -> BleakClient:
+        """Return the cached client, (re)connecting lazily if needed."""
+        if self._client is None or not self._client.is_connected:
+            client = BleakClient(self.address)
+            try:
+                await client.connect()
+            except (BleakError, OSError) as e:
+                raise QardioConnectionError("cannot connect") from e
+            self._client = client
+        return self._client
+
+    async def _read_char(self, uuid: str) -> bytes:
+        """Read a single GATT characteristic over the cached connection."""
+        client = await self._get_client()
+        try:
+            return await client.read_gatt_char(uuid)
+        except BleakError as e:
+            raise QardioConnectionError(f"read failed: {e}") from e
+
+    async def _read_all(self, uuids, return_exceptions=False) -> dict:
+        """
+        Read several characteristics over a single connection.
+        With return_exceptions=True a failed read maps its UUID to the
+        exception instead of aborting the remaining reads.
+        """
+        client = await self._get_client()
+        results = {}
+        for u in uuids:
+            try:
+                results[u] = await client.read_gatt_char(u)
+            except BleakError as e:
+                err = QardioConnectionError(f"read failed: {e}")
+                if not return_exceptions:
+                    raise err from e
+                results[u] = err
+        return results
+
+    def read_characteristics(self, uuids, return_exceptions=False) -> dict:
+        """Read characteristics over the cached connection (shell hook)."""
+        return self._run(self._read_all(uuids, return_exceptions))
+
+    async def _close(self):
+        if self._client is not None and self._client.is_connected:
+            try:
+                await self._client.disconnect()
+            except BleakError:
+                pass
+        self._client = None
+
+    def close(self):
+        """Disconnect the cached client and stop the plugin loop."""
+        try:
+            self._run(self._close())
+        finally:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+
+    async def _measure(self, progress=None) -> dict:
+        client = await self._get_client()
+        return await _measure_async(client, self.timeout, progress)
 
     def measure(self, progress=None) -> dict | None:
         """Perform blood pressure measurement."""
         try:
-            m = asyncio.run(_measure_async(self.address, self.timeout, progress))
+            m = self._run(self._measure(progress))
         except (QardioConnectionError, QardioMeasurementAborted) as e:
             print(f"[FAIL] {e}")
             return None
 
-        battery = asyncio.run(_read_char_async(self.address, BATT_UUID))[0]
+        # reuses the connection left open by the measurement
+        battery = self._run(self._read_char(BATT_UUID))[0]
         conditions = decode_conditions(m.get("status") or 0)
         row = {
             "timestamp": datetime.datetime.now().isoformat(sep=" ", timespec="seconds"),
@@ -173,17 +278,17 @@ class Plugin(PluginBase):
 
     def get_battery(self) -> int:
         """Read battery percentage."""
-        return asyncio.run(_read_char_async(self.address, BATT_UUID))[0]
+        return self._run(self._read_char(BATT_UUID))[0]
 
     def get_device_info(self) -> dict:
-        """Read Device Information Service fields."""
-        info = {}
-        for uuid in (
+        """Read Device Information Service fields over one connection."""
+        raws = self._run(self._read_all((
             DI_MANUF_UUID, DI_MODEL_UUID, DI_SERIAL_UUID,
             DI_FWREV_UUID, DI_SWREV_UUID, DI_HWREV_UUID,
             DI_SYSTEMID_UUID, DI_PNPID_UUID
-        ):
-            raw = asyncio.run(_read_char_async(self.address, uuid))
+        )))
+        info = {}
+        for uuid, raw in raws.items():
             try:
                 info[uuid] = raw.decode().strip()
             except:
@@ -192,7 +297,7 @@ class Plugin(PluginBase):
 
     def get_features(self) -> dict:
         """Read Blood Pressure Feature bitmask & supported list."""
-        raw = asyncio.run(_read_char_async(self.address, BP_FEATURE_UUID))
+        raw = self._run(self._read_char(BP_FEATURE_UUID))
         mask = int.from_bytes(raw, 'little')
         features_map = {
             0:"Body Movement Detection",1:"Cuff Fit Detection",
@@ -11,3 +11,6 @@ class PluginBase:
 
     def write(self, uuid, val):
         raise NotImplementedError
+
+    def close(self):
+        """Release device resources; default plugins hold none."""
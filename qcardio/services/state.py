@@ -1,15 +1,84 @@
-import json, os
+import atexit, json, os, sys, time
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def _intern_keys(obj):
+    """Intern dict keys so repeated measurement fields share storage."""
+    if isinstance(obj, dict):
+        return {sys.intern(k): _intern_keys(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_intern_keys(v) for v in obj]
+    return obj
+
 class StateService:
+    # minimum seconds between non-forced flushes
+    _DEBOUNCE = 0.5
+
     def __init__(self, cfg):
         self.path = os.path.expanduser("~/.config/qcardio/state.json")
         self.state = self._load()
         self.data = {}
-        
+        self._last_save = 0.0
+        self._dirty = False
+        # lazy {(dataset, field): {value: [positions]}} lookup indexes
+        self._indexes = {}
+        # flush deferred saves even on Ctrl-C, where postloop never runs
+        atexit.register(self._flush_if_dirty)
+
+    def dataset_index(self, name, field, data):
+        """
+        Returns {str(value): [positions]} for a list-of-dicts dataset,
+        building it on first use for this (dataset, field) pair.
+        """
+        key = (name, field)
+        idx = self._indexes.get(key)
+        if idx is None:
+            idx = {}
+            for pos, item in enumerate(data):
+                if isinstance(item, dict) and (v := item.get(field)) is not None:
+                    idx.setdefault(v if type(v) is str else str(v), []).append(pos)
+            self._indexes[key] = idx
+        return idx
+
+    def drop_indexes(self, name):
+        """Forget cached indexes for a dataset that has been reassigned."""
+        for key in [k for k in self._indexes if k[0] == name]:
+            del self._indexes[key]
+
     def _load(self):
-        if os.path.exists(self.path):
-            return json.load(open(self.path))
-        return {}
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path, 'rb') as f:
+            payload = f.read()
+        if orjson is not None:
+            state = orjson.loads(payload)
+        else:
+            state = json.loads(payload)
+        return _intern_keys(state)
+
+    def _flush_if_dirty(self):
+        if self._dirty:
+            self.save(force=True)
 
-    def save(self):
+    def save(self, force=False):
+        now = time.monotonic()
+        if not force and now - self._last_save < self._DEBOUNCE:
+            # defer instead of dropping: a later save or the atexit
+            # hook flushes what accumulated inside the window
+            self._dirty = True
+            return
+        self._last_save = now
+        self._dirty = False
         os.makedirs(os.path.dirname(self.path), exist_ok=True)
-        json.dump(self.state, open(self.path, 'w'), indent=2)
+        if orjson is not None:
+            payload = orjson.dumps(self.state, option=orjson.OPT_INDENT_2)
+        else:
+            payload = json.dumps(self.state, indent=2).encode()
+        # write to a temp file and rename so a crash never truncates state
+        tmp = self.path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(payload)
+        os.replace(tmp, self.path)